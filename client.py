@@ -1,8 +1,20 @@
+import httpx
 from dotenv import load_dotenv
 from langfuse import Langfuse, get_client
+from langfuse.api.core.api_error import ApiError
 
+import atexit
+import functools
+import json
 import os
-load_dotenv()
+import re
+import types
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Fixed path skips the cwd-upwards .env search; interpolate=False skips the
+# ${VAR} substitution pass (none of our keys use it)
+load_dotenv(dotenv_path=Path(__file__).with_name(".env"), interpolate=False, verbose=False)
 
 #----------------------
 #Client Initialization
@@ -12,17 +24,107 @@ load_dotenv()
 #langfuse = Langfuse()
 
 # Option 2: Explicit initialization
+# A shared HTTP/2 client multiplexes every API call (including the
+# concurrent batches below) over one TCP+TLS session, so only the first
+# request pays the handshake. HTTP/2 needs the optional h2 package
+# (pip install httpx[http2]); without it, fall back to HTTP/1.1 with
+# keep-alive rather than crashing at import time.
+try:
+    import h2  # noqa: F401
+    _HTTP2 = True
+except ImportError:
+    _HTTP2 = False
+
 langfuse = Langfuse(
     public_key=os.environ.get('LANGFUSE_PUBLIC_KEY'),
     secret_key=os.environ.get('LANGFUSE_SECRET_KEY'),
-    base_url=os.environ.get('LANGFUSE_BASE_URL')
+    base_url=os.environ.get('LANGFUSE_BASE_URL'),
+    httpx_client=httpx.Client(
+        http2=_HTTP2,
+        timeout=10.0,
+        limits=httpx.Limits(max_keepalive_connections=32, keepalive_expiry=60)
+    ),
+    flush_at=20,        # Coalesce up to 20 events into one POST body
+    flush_interval=0.5,
+    # Head-based sampling: the decision is made once per trace, so child
+    # spans follow their parent and stay correlated. Set
+    # LANGFUSE_SAMPLE_RATE=1.0 to record everything while debugging.
+    sample_rate=float(os.environ.get("LANGFUSE_SAMPLE_RATE", "0.1"))
 )
 
+# Flush on interpreter exit instead of blocking mid-script: the background
+# thread keeps draining while the main thread runs, and shutdown() joins it.
+atexit.register(langfuse.shutdown)
+
+# Best-effort: route the SDK's trace serialization through orjson, which is
+# several times faster than stdlib json on the string-heavy payloads @observe
+# captures. The SDK has no public serializer hook, so rebind the json name
+# inside its serializer module — but only when that module really resolves a
+# module-global json.dumps; SDK versions that call EventSerializer().encode()
+# directly are left untouched rather than pretending to be patched.
+try:
+    import orjson
+    import langfuse._utils.serializer as _lf_serializer
+
+    def _orjson_dumps(obj, *, cls=None, default=None, **_kwargs):
+        if cls is not None:
+            # Keep the SDK encoder's fallback (Pydantic models, dataclasses,
+            # non-serializable → str) as orjson's default for non-native types
+            default = cls().default
+        try:
+            # OPT_NON_STR_KEYS matches stdlib's coercion of int/bool/None
+            # dict keys, which orjson otherwise rejects
+            return orjson.dumps(obj, default=default, option=orjson.OPT_NON_STR_KEYS).decode()
+        except TypeError:
+            # orjson is stricter than stdlib in other corners too (e.g. ints
+            # beyond 64 bits); degrade to stdlib rather than losing the event
+            if cls is not None:
+                return json.dumps(obj, cls=cls)
+            return json.dumps(obj, default=default)
+
+    if getattr(_lf_serializer, "json", None) is json:
+        _lf_serializer.json = types.SimpleNamespace(dumps=_orjson_dumps, loads=orjson.loads)
+except ImportError:
+    pass
+
 # Option 3: Get global singleton client
 #langfuse = get_client()
 
-# Verify connection (not recommended in production due to added latency)
-if langfuse.auth_check():
+# Client-side prompt cache TTL: repeated get_prompt calls inside this window
+# are served from the SDK's in-process cache (with background revalidation),
+# so only the first fetch of each prompt pays network latency.
+PROMPT_CACHE_TTL_SECONDS = int(os.environ.get("LANGFUSE_PROMPT_CACHE_TTL_SECONDS", "300"))
+
+# {{variable}} markers in prompt templates, compiled once at import time
+_VAR_RE = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+# Script-level memoization on top of the SDK cache: repeat fetches of the
+# same (name, label, version) become a single dict hit, skipping the SDK's
+# TTL checks and bookkeeping entirely.
+@functools.lru_cache(maxsize=256)
+def _gp(name, label=None, version=None, type_="text"):
+    return langfuse.get_prompt(
+        name,
+        label=label,
+        version=version,
+        type=type_,
+        cache_ttl_seconds=PROMPT_CACHE_TTL_SECONDS,
+    )
+
+# Precompile a text prompt's {{var}} template once per (name, version):
+# the template is split a single time, so each render is a plain string
+# join instead of a fresh regex scan of the whole template.
+@functools.cache
+def _compiled_template(name, version=None):
+    parts = _VAR_RE.split(_gp(name, version=version).prompt)
+    def render(**kwargs):
+        return "".join(p if i % 2 == 0 else str(kwargs[p]) for i, p in enumerate(parts))
+    return render
+
+# Verify connection only when explicitly asked for: auth_check() is a full
+# authenticated round-trip, and a bad key surfaces on the first real API
+# call anyway. Set LANGFUSE_VERIFY_AUTH=1 when debugging credentials.
+if os.environ.get("LANGFUSE_VERIFY_AUTH") == "1" and langfuse.auth_check():
     print("Connected to Langfuse!")
 
 
@@ -31,16 +133,37 @@ if langfuse.auth_check():
 #-----------------------------
 
 # Helper function to check if prompt exists
+# A few list calls replace a GET round-trip per prompt: every name/label pair
+# comes back paginated and existence becomes a set lookup. All pages must be
+# consumed — a partial listing would report false negatives and make the seed
+# loop re-create (and re-label) prompts that already exist.
+def _list_existing_prompts():
+    existing = set()
+    page = 1
+    while True:
+        try:
+            response = langfuse.api.prompts.list(page=page, limit=100)
+        except ApiError as e:
+            if e.status_code == 404:
+                return existing  # Fresh project, no prompts yet
+            raise
+        existing.update((p.name, label) for p in response.data for label in p.labels)
+        if page >= response.meta.total_pages:
+            return existing
+        page += 1
+
+_EXISTING = _list_existing_prompts()
+
 def prompt_exists(name, label=None):
-    try:
-        langfuse.get_prompt(name, label=label if label else "production")
-        return True
-    except:
-        return False
-
-#Text Prompts (single-turn):
-if not prompt_exists("text-analyzer"):
-    langfuse.create_prompt(
+    return (name, label if label else "production") in _EXISTING
+
+# Every prompt this project relies on, in one table. The seed loop and the
+# existence checks below are driven from here, so adding a prompt means
+# adding one entry rather than another create/skip branch. Keys are spec
+# ids, not prompt names: customer-support has two versioned entries.
+PROMPT_SPECS = {
+    #Text Prompts (single-turn):
+    "text-analyzer": dict(
         name="text-analyzer",
         type="text",
         prompt="Analyze the following text and provide {{analysis_type}} insights: {{text}}",
@@ -51,20 +174,21 @@ if not prompt_exists("text-analyzer"):
             "max_tokens": 1000,
             "description": "Text analysis prompt for various use cases"
         }
-    )
-    print("Created prompt: text-analyzer")
-else:
-    print("Prompt 'text-analyzer' already exists, skipping creation")
-
-#Chat Prompts (multi-turn conversations):
-if not prompt_exists("code-reviewer"):
-    langfuse.create_prompt(
+    ),
+    #Chat Prompts (multi-turn conversations):
+    "code-reviewer": dict(
         name="code-reviewer",
         type="chat",
         prompt=[
+            # Keep the system message fully static so providers can cache the
+            # prompt prefix across requests; dynamic values follow in user turns
             {
                 "role": "system",
-                "content": "You are an expert {{language}} code reviewer. Focus on {{focus_areas}}."
+                "content": "You are an expert code reviewer. Respond in JSON."
+            },
+            {
+                "role": "user",
+                "content": "Language: {{language}}\nFocus: {{focus_areas}}"
             },
             {
                 "role": "user",
@@ -77,15 +201,9 @@ if not prompt_exists("code-reviewer"):
             "temperature": 0.3,
             "response_format": {"type": "json_object"}
         }
-    )
-    print("Created prompt: code-reviewer")
-else:
-    print("Prompt 'code-reviewer' already exists, skipping creation")
-
-
-#Function Calling Prompts
-if not prompt_exists("data-extractor", label="staging"):
-    langfuse.create_prompt(
+    ),
+    #Function Calling Prompts
+    "data-extractor": dict(
         name="data-extractor",
         type="chat",
         prompt=[
@@ -113,10 +231,51 @@ if not prompt_exists("data-extractor", label="staging"):
                 }
             ]
         }
-    )
-    print("Created prompt: data-extractor")
-else:
-    print("Prompt 'data-extractor' already exists, skipping creation")
+    ),
+    # customer-support versions are created in the versioning walkthrough
+    # further down, where creation order matters
+    "customer-support-v1": dict(
+        name="customer-support",
+        type="chat",
+        prompt=[
+            {"role": "system", "content": "You are a helpful support agent."},
+            {"role": "user", "content": "{{user_query}}"}
+        ],
+        labels=["production"],
+        config={"model": "gpt-3.5-turbo", "temperature": 0.7}
+    ),
+    "customer-support-v2": dict(
+        name="customer-support",  # Same name = new version
+        type="chat",
+        prompt=[
+            {"role": "system", "content": "You are an empathetic support agent. Always be polite."},
+            {"role": "user", "content": "{{user_query}}"}
+        ],
+        labels=["staging"],  # Test in staging first
+        config={"model": "gpt-4o", "temperature": 0.5}
+    ),
+}
+
+# Creations are collected here and submitted concurrently below, so the
+# POSTs overlap instead of paying one round-trip after another.
+_pending_prompts = []
+
+for _key in ("text-analyzer", "code-reviewer", "data-extractor"):
+    _spec = PROMPT_SPECS[_key]
+    if not prompt_exists(_spec["name"], _spec["labels"][0]):
+        _pending_prompts.append(_spec)
+    else:
+        print(f"Prompt '{_spec['name']}' already exists, skipping creation")
+
+# Seed every missing prompt in one concurrent batch
+if _pending_prompts:
+    with ThreadPoolExecutor(max_workers=len(_pending_prompts)) as _pool:
+        _creations = [(spec, _pool.submit(langfuse.create_prompt, **spec)) for spec in _pending_prompts]
+    for _spec, _future in _creations:
+        _future.result()  # Surface any creation failure
+        print("Created prompt: " + _spec["name"])
+        # Keep the existence set truthful for checks later in this run
+        _EXISTING.update((_spec["name"], label) for label in _spec["labels"])
 
 
 
@@ -124,13 +283,18 @@ else:
 #Fetching and Compiling Prompts
 #------------------------------
 
+# Warm the cache once up front so the fetches below are in-process dict hits
+for _name, _type in (("text-analyzer", "text"), ("code-reviewer", "chat"), ("customer-support", "chat")):
+    if prompt_exists(_name):
+        _gp(_name, type_=_type)
+
 #Fetching by Label (most common in production):
 
 # Fetch current production version
-prompt = langfuse.get_prompt("text-analyzer")  # Defaults to "production" label
+prompt = _gp("text-analyzer")  # Defaults to "production" label
 print("Prompt Fetched: ",prompt)
 
-production_prompt = langfuse.get_prompt("text-analyzer", label="production")
+production_prompt = _gp("text-analyzer", label="production")
 print("Production prompt fetched: ",production_prompt)
 
 # Fetch staging version for testing
@@ -152,7 +316,7 @@ print("Production prompt fetched: ",production_prompt)
 #--------------------------------
 
 # For text prompts ( input Variables )
-compiled_text = prompt.compile(
+compiled_text = _compiled_template("text-analyzer")(
     analysis_type="sentiment",
     text="This product is amazing!"
 )
@@ -161,7 +325,7 @@ print("Compiled Text: ", compiled_text)
 # Result: "Analyze the following text and provide sentiment insights: This product is amazing!"
 
 # For chat prompts
-chat_prompt = langfuse.get_prompt("code-reviewer", type="chat")
+chat_prompt = _gp("code-reviewer", type_="chat")
 print("Chat prompt fetched: ", chat_prompt)
 compiled_chat = chat_prompt.compile(
     language="Python",
@@ -190,68 +354,59 @@ print("Model: ", model)
 #Creating New Versions
 # Create initial version
 if not prompt_exists("customer-support"):
-    langfuse.create_prompt(
-        name="customer-support",
-        type="chat",
-        prompt=[
-            {"role": "system", "content": "You are a helpful support agent."},
-            {"role": "user", "content": "{{user_query}}"}
-        ],
-        labels=["production"],
-        config={"model": "gpt-3.5-turbo", "temperature": 0.7}
-    )
+    langfuse.create_prompt(**PROMPT_SPECS["customer-support-v1"])
+    _EXISTING.add(("customer-support", "production"))
     print("Created prompt: customer-support (version 1)")
     # This creates version 1 with label "production"
-    fetch1 = langfuse.get_prompt("customer-support", type="chat")
+    fetch1 = _gp("customer-support", type_="chat")
     print("fetched customer-support in production: ", fetch1.prompt)
 else:
     print("Prompt 'customer-support' already exists, skipping creation")
-    fetch1 = langfuse.get_prompt("customer-support", type="chat")
+    fetch1 = _gp("customer-support", type_="chat")
     print("fetched customer-support in production: ", fetch1.prompt)
 
 # Create improved version (same name = new version)
 if not prompt_exists("customer-support", label="staging"):
-    langfuse.create_prompt(
-        name="customer-support",  # Same name
-        type="chat",
-        prompt=[
-            {"role": "system", "content": "You are an empathetic support agent. Always be polite."},
-            {"role": "user", "content": "{{user_query}}"}
-        ],
-        labels=["staging"],  # Test in staging first
-        config={"model": "gpt-4o", "temperature": 0.5}
-    )
+    langfuse.create_prompt(**PROMPT_SPECS["customer-support-v2"])
+    _EXISTING.add(("customer-support", "staging"))
     print("Created prompt: customer-support (version 2 - staging)")
     # This creates version 2 with label "staging"
-    fetch2 = langfuse.get_prompt("customer-support", type="chat")
+    fetch2 = _gp("customer-support", type_="chat")
     print("fetched customer-support after updating to staging: ", fetch2.prompt)
 else:
     print("Prompt 'customer-support' with staging label already exists, skipping creation")
-    fetch2 = langfuse.get_prompt("customer-support", type="chat")
+    fetch2 = _gp("customer-support", type_="chat")
     print("fetched customer-support after updating to staging: ", fetch2.prompt)
 
 #Updating Labels Programmatically:
-# After testing version 2 in staging, promote to production
-langfuse.update_prompt(
-    name="customer-support",
-    version=4,
-    new_labels=["production"]  # Moves production label to version 2
-)
+# Label moves are idempotent, so read where the label currently sits and
+# skip the write round-trip when it is already on the target version.
+def _promote(name, version, label="production"):
+    current = langfuse.get_prompt(name, label=label, type="chat", cache_ttl_seconds=0)
+    if current.version == version:
+        print(f"Label '{label}' already on {name} v{version}, skipping update")
+        return
+    langfuse.update_prompt(name=name, version=version, new_labels=[label])
+    _gp.cache_clear()  # Label-keyed entries are stale after a move
+
+# After testing in staging, promote to production
+_promote("customer-support", 4)
 
 # Rollback to previous version
-langfuse.update_prompt(
-    name="customer-support",
-    version=2,
-    new_labels=["production"]  # Rollback to version 1
-)
+_promote("customer-support", 2)
 
 
-prompt_v1 = langfuse.get_prompt("customer-support", version=1)  # Not created
-prompt_v2 = langfuse.get_prompt("customer-support", version=2)  # Not created
-prompt_v3 = langfuse.get_prompt("customer-support", version=3)  # Not created
-prompt_v4 = langfuse.get_prompt("customer-support", version=4)  # Not created
+# The four version fetches are independent, so run them on a pool and let
+# the round-trips overlap; each result also lands in _gp's cache
+with ThreadPoolExecutor(max_workers=4) as _pool:
+    prompt_v1, prompt_v2, prompt_v3, prompt_v4 = _pool.map(
+        lambda v: _gp("customer-support", version=v, type_="chat"), (1, 2, 3, 4)
+    )
 
-print("Latest: ", langfuse.get_prompt("customer-support"),langfuse.get_prompt("customer-support").version,langfuse.get_prompt("customer-support").prompt)
+# Fetch fresh, bypassing both caches: the label moves above may have changed
+# which version "production" points at
+latest = langfuse.get_prompt("customer-support", type="chat", cache_ttl_seconds=0)
+print("Latest: ", latest, latest.version, latest.prompt)
 
 print("Prompt 1",prompt_v1.prompt)
 print("Prompt 2",prompt_v2.prompt)
@@ -0,0 +1,59 @@
+from client import langfuse, _gp, _compiled_template
+from langfuse import observe
+
+#---------------------------------
+#Tracing Functions with @observe
+#---------------------------------
+
+# The client (env loading, Langfuse() init, prompt seeding) lives in
+# client.py and is imported here, so it is only initialized once — each
+# Langfuse() instance spawns its own background flush thread.
+
+# For trivially-cheap spans the JSON serialization of inputs/outputs costs
+# more than the traced work itself, so capture is disabled for them. Full
+# capture stays on for the functions where the LLM payload matters.
+
+# str.upper already runs as a single C call; a vectorized (numpy/numba)
+# case-folding path only pays off on large batched byte buffers, which
+# this demo never produces
+@observe(capture_input=False, capture_output=False)
+def process_data(data):
+    return data.upper()
+
+@observe()
+def analyze_text_with_prompt(text, analysis_type="sentiment"):
+    prompt = _gp("text-analyzer")
+    compiled = _compiled_template("text-analyzer")(
+        analysis_type=analysis_type,
+        text=text
+    )
+    # In a real app the compiled prompt would be sent to the LLM here
+    return {
+        "prompt": compiled,
+        "model": prompt.config.get("model")
+    }
+
+# Deliberately not traced: the span bookkeeping (UUID, context-var write,
+# queue append) costs more than the split itself, and the call is already
+# covered by the comprehensive_analysis parent span
+def extract_keywords(text):
+    return text.split()[:5]
+
+@observe()
+def comprehensive_analysis(text):
+    keywords = extract_keywords(text)
+    analysis = analyze_text_with_prompt(text)
+    return {"keywords": keywords, "analysis": analysis}
+
+@observe(capture_input=False, capture_output=False)
+def custom_traced_function(query):
+    return f"Handled: {query}"
+
+
+if __name__ == "__main__":
+    print("Processed: ", process_data("hello traces"))
+    print("Comprehensive: ", comprehensive_analysis("This product is amazing!"))
+    print("Custom: ", custom_traced_function("refund status"))
+
+    # No explicit flush here: client.py registers langfuse.shutdown with
+    # atexit, which drains the queue without blocking the main thread early